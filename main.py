@@ -1,12 +1,40 @@
 import pandas as pd
+import importlib.util
 import smtplib
+import base64
+import hashlib
+import bisect
+import functools
 import json
 import os
-from datetime import date, timedelta
-from email.message import EmailMessage
+import re
+from datetime import date
+from email.header import Header
+
+# Prefer the Rust-based calamine reader; fall back to openpyxl if it isn't installed
+try:
+    import python_calamine # noqa: F401 (only checked for availability)
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# Same for orjson's C parser over the standard json module
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 EXCEL_FILE = 'schedule.xlsx'
 EXCEPTIONS_FILE = 'exceptions.json'
+CACHE_DIR = '.cache' # Parsed copies of the Excel file, keyed by its content hash
+# calamine parses the workbook faster than parquet loads, so the cache only backs the openpyxl fallback
+USE_CACHE = EXCEL_ENGINE == 'openpyxl' and importlib.util.find_spec('pyarrow') is not None
+CACHE_VERSION = 4 # Bump whenever load_data() changes the shape of the cleaned DataFrame
+SCHEDULE_COLUMNS = ['Day', 'WeekType', 'Time', 'Course', 'Room', 'Type']
+
+# Fixed value sets for the filter columns, stored as categories so filtering compares small integer codes
+DAY_DTYPE = pd.CategoricalDtype(['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'])
+WEEK_TYPE_DTYPE = pd.CategoricalDtype(['all', 'odd', 'even'])
 SEND_EMPTY_EMAIL = True # Set to True if you want an email saying "No classes"
 
 SEMESTER_START_DATE = date(2026, 2, 23) 
@@ -16,129 +44,265 @@ HOLIDAY_WEEKS_MONDAYS = [
     date(2026, 4, 13), # Example: Spring Break week
 ]
 
+# Day ordinals of the semester's first Monday and of the holiday Mondays, so parity is plain integer math
+_START_MONDAY_ORD = SEMESTER_START_DATE.toordinal() - SEMESTER_START_DATE.weekday()
+_HOLIDAY_ORDS = sorted(hw.toordinal() for hw in HOLIDAY_WEEKS_MONDAYS)
+
+def get_cache_path():
+    """Returns the parquet cache path for the current contents of the Excel file."""
+    with open(EXCEL_FILE, 'rb') as f:
+        file_hash = hashlib.sha256(f.read()).hexdigest()
+    return os.path.join(CACHE_DIR, f"schedule-v{CACHE_VERSION}-{file_hash}.parquet")
+
+def lower_as_category(series, dtype):
+    """
+    Lower-cases a low-cardinality column into the given categorical dtype.
+    Only the distinct values go through str.lower(); rows are mapped by a hash lookup.
+    """
+    lowered = {value: value.lower() for value in series.dropna().unique()}
+    return series.map(lowered).astype(dtype)
+
 def load_data():
     """Loads the schedule and handles file not found errors."""
     if not os.path.exists(EXCEL_FILE):
         raise FileNotFoundError(f"Could not find {EXCEL_FILE}")
+
+    # Reuse the cleaned DataFrame if this exact file was already parsed
+    cache_path = get_cache_path() if USE_CACHE else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"Warning: Could not read cache ({e}). Re-parsing {EXCEL_FILE}.")
     
-    # Load excel, treat all columns as strings to avoid format issues
-    df = pd.read_excel(EXCEL_FILE, dtype=str)
+    # Load excel, treat all columns as strings to avoid format issues.
+    # Only the columns we use are kept (headers compared without surrounding whitespace).
+    df = pd.read_excel(
+        EXCEL_FILE,
+        dtype=str,
+        engine=EXCEL_ENGINE,
+        usecols=lambda name: str(name).strip() in SCHEDULE_COLUMNS,
+    )
     
     # Clean whitespace from column headers and values
     df.columns = df.columns.str.strip()
-    df = df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
+    missing = [col for col in SCHEDULE_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"❌ Error: Column(s) {', '.join(missing)} not found in Excel file.")
+    df[SCHEDULE_COLUMNS] = df[SCHEDULE_COLUMNS].apply(lambda col: col.str.strip())
+
+    # Blank display cells become '' so a fresh parse and a cache hit render the same
+    # (a parquet round trip turns NaN into None)
+    df = df.fillna({col: '' for col in ('Time', 'Course', 'Room', 'Type')})
+
+    # Normalize the filter columns once so main() doesn't re-lowercase them per comparison
+    # (unknown values become NaN and never match, same as before)
+    df['_day_lc'] = lower_as_category(df['Day'], DAY_DTYPE)
+    df['_wt_lc'] = lower_as_category(df['WeekType'].fillna('all'), WEEK_TYPE_DTYPE)
+
+    if cache_path:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            df.to_parquet(cache_path, index=False)
+        except Exception as e:
+            print(f"Warning: Could not write cache ({e}).")
     return df
 
-def get_academic_week_parity(today_date):
-    """
-    Calculates if the current academic week is 'odd' or 'even', 
-    accounting for holiday weeks that pause the cycle.
-    """
-    # Find the Monday of the current week and the start week
-    current_monday = today_date - timedelta(days=today_date.weekday())
-    start_monday = SEMESTER_START_DATE - timedelta(days=SEMESTER_START_DATE.weekday())
-    
-    if current_monday < start_monday:
+@functools.lru_cache(maxsize=64)
+def _parity_for_monday(current_monday):
+    """Cached parity lookup for the week starting on the given Monday ordinal."""
+    if current_monday < _START_MONDAY_ORD:
         return "all" # Fallback if run before semester starts
         
     # Calculate total calendar weeks elapsed since semester start
-    days_elapsed = (current_monday - start_monday).days
-    calendar_weeks_elapsed = days_elapsed // 7
+    calendar_weeks_elapsed = (current_monday - _START_MONDAY_ORD) // 7
     
     # Count how many holiday weeks have occurred up to this point
-    holidays_passed = sum(1 for hw in HOLIDAY_WEEKS_MONDAYS if hw <= current_monday)
+    holidays_passed = bisect.bisect_right(_HOLIDAY_ORDS, current_monday)
     
     # Calculate true academic week index (0 = Week 1, 1 = Week 2)
     academic_week_index = calendar_weeks_elapsed - holidays_passed
     
     # If the current week IS a holiday week
-    if current_monday in HOLIDAY_WEEKS_MONDAYS:
+    if holidays_passed and _HOLIDAY_ORDS[holidays_passed - 1] == current_monday:
         return "holiday"
         
     return "even" if academic_week_index % 2 != 0 else "odd"
 
-def get_todays_exceptions():
-    """Parses exceptions.json to see if there are specific rules for today."""
+# Parity of every week of the first year of the semester, one byte per week ('o', 'e' or 'h')
+_PARITY_LUT_WEEKS = 52
+_PARITY_NAMES = {ord('o'): "odd", ord('e'): "even", ord('h'): "holiday"}
+_PARITY_LUT = bytes(
+    ord(_parity_for_monday.__wrapped__(_START_MONDAY_ORD + 7 * week)[0]) for week in range(_PARITY_LUT_WEEKS)
+)
+
+def get_academic_week_parity(today_date):
+    """
+    Calculates if the current academic week is 'odd' or 'even', 
+    accounting for holiday weeks that pause the cycle.
+    """
+    # Find the Monday of the current week (as a day ordinal)
+    current_monday = today_date.toordinal() - today_date.weekday()
+
+    # Weeks inside the precomputed table are a single index; anything else goes through the cache
+    week = (current_monday - _START_MONDAY_ORD) // 7
+    if 0 <= week < len(_PARITY_LUT):
+        return _PARITY_NAMES[_PARITY_LUT[week]]
+    return _parity_for_monday(current_monday)
+
+@functools.lru_cache(maxsize=1)
+def load_exceptions():
+    """Parses exceptions.json once per process into a dict keyed by date."""
     if not os.path.exists(EXCEPTIONS_FILE):
-        return None
+        return {}
 
     try:
-        with open(EXCEPTIONS_FILE, 'r') as f:
-            data = json.load(f)
-            
-        today_str = date.today().strftime("%Y-%m-%d")
-        
-        for entry in data:
-            if entry.get("date") == today_str:
-                return entry
-    except json.JSONDecodeError:
+        with open(EXCEPTIONS_FILE, 'rb') as f:
+            data = json_loads(f.read())
+    except json.JSONDecodeError: # orjson's error type subclasses this one
         print("Warning: JSON file is malformed. Ignoring exceptions.")
-    
-    return None
+        return {}
+
+    # Keep the first entry for a date, like the old top-to-bottom scan did
+    exceptions = {}
+    for entry in data:
+        exceptions.setdefault(entry.get("date"), entry)
+    return exceptions
+
+def get_todays_exceptions(today_str):
+    """Looks up the exceptions.json rules for today (a YYYY-MM-DD string), if there are any."""
+    return load_exceptions().get(today_str)
+
+CELL_STYLE = "padding: 10px; border: 1px solid #ddd;"
 
 def format_email_body(classes, date_str):
     """Generates an HTML body for the email."""
-    html_content = f"""
+    # pandas renders (and HTML-escapes) the whole table; styling comes from the .sched rules below
+    table_html = classes[['Time', 'Course', 'Room', 'Type']].to_html(
+        index=False, border=0, classes='sched', justify='left', escape=True
+    )
+
+    return f"""
     <html>
+        <head>
+            <style>
+                .sched {{ border-collapse: collapse; width: 100%; max-width: 600px; }}
+                .sched th, .sched td {{ {CELL_STYLE} text-align: left; }}
+                .sched th {{ background-color: #f2f2f2; }}
+                .sched td:nth-child(2) {{ font-weight: bold; }}
+            </style>
+        </head>
         <body style="font-family: Arial, sans-serif;">
             <h2 style="color: #2E86C1;">📅 Schedule for {date_str}</h2>
-            <table style="border-collapse: collapse; width: 100%; max-width: 600px;">
-                <tr style="background-color: #f2f2f2;">
-                    <th style="padding: 10px; border: 1px solid #ddd; text-align: left;">Time</th>
-                    <th style="padding: 10px; border: 1px solid #ddd; text-align: left;">Course</th>
-                    <th style="padding: 10px; border: 1px solid #ddd; text-align: left;">Room</th>
-                    <th style="padding: 10px; border: 1px solid #ddd; text-align: left;">Type</th>
-                </tr>
-    """
-    
-    for _, row in classes.iterrows():
-        html_content += f"""
-                <tr>
-                    <td style="padding: 10px; border: 1px solid #ddd;">{row['Time']}</td>
-                    <td style="padding: 10px; border: 1px solid #ddd;"><strong>{row['Course']}</strong></td>
-                    <td style="padding: 10px; border: 1px solid #ddd;">{row['Room']}</td>
-                    <td style="padding: 10px; border: 1px solid #ddd;">{row['Type']}</td>
-                </tr>
-        """
-        
-    html_content += """
-            </table>
+            {table_html}
             <br>
             <p style="font-size: small; color: gray;">Automated by Python 🐍</p>
         </body>
     </html>
     """
-    return html_content
 
-def send_email(subject, body_html):
-    """Sends the email using Environment Variables."""
-    email_address = os.environ.get('EMAIL_USER')
-    email_password = os.environ.get('EMAIL_PASS')
+class SMTPSession:
+    """
+    Keeps one logged-in SMTP connection open and reuses it for every email sent,
+    reconnecting only when the server has dropped it.
+    """
+    def __init__(self, email_address, email_password, host='smtp.gmail.com', port=465):
+        self.email_address = email_address
+        self.email_password = email_password
+        self.host = host
+        self.port = port
+        self._smtp = None
+
+    def _is_alive(self):
+        """Checks the open connection with a NOOP before reusing it."""
+        if self._smtp is None:
+            return False
+        try:
+            return self._smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _connect(self):
+        self.close()
+        smtp = smtplib.SMTP_SSL(self.host, self.port)
+        # Only keep the connection once it is authenticated, so a failed login is retried next time
+        try:
+            smtp.login(self.email_address, self.email_password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+    def send(self, to_address, raw_message):
+        """Sends an already-encoded message, opening (or reopening) the connection if needed."""
+        if not self._is_alive():
+            self._connect()
+        self._smtp.sendmail(self.email_address, [to_address], raw_message)
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
 
-    if not email_address or not email_password:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+# multipart/alternative message with a plain-text fallback and a base64 HTML part.
+# Base64 never contains '-', so the HTML can't collide with the boundary.
+RAW_EMAIL_TEMPLATE = (
+    "From: {sender}\r\n"
+    "To: {recipient}\r\n"
+    "Subject: {subject}\r\n"
+    "MIME-Version: 1.0\r\n"
+    'Content-Type: multipart/alternative; boundary="schedule-alt"\r\n'
+    "\r\n"
+    "--schedule-alt\r\n"
+    'Content-Type: text/plain; charset="us-ascii"\r\n'
+    "\r\n"
+    "Your email client does not support HTML.\r\n"
+    "--schedule-alt\r\n"
+    'Content-Type: text/html; charset="utf-8"\r\n'
+    "Content-Transfer-Encoding: base64\r\n"
+    "\r\n"
+    "{body}"
+    "--schedule-alt--\r\n"
+)
+
+def build_raw_email(sender, recipient, subject, body_html):
+    """Renders the email straight to bytes, skipping the email package's MIME machinery."""
+    return RAW_EMAIL_TEMPLATE.format(
+        sender=sender,
+        recipient=recipient,
+        subject=Header(subject, 'utf-8').encode(linesep='\r\n'), # RFC 2047, the subjects contain emoji
+        body=base64.encodebytes(body_html.encode('utf-8')).decode('ascii').replace('\n', '\r\n'),
+    ).encode('ascii')
+
+def send_email(session, subject, body_html):
+    """Sends the email through an open SMTP session."""
+    if not session.email_address or not session.email_password:
         print("❌ Error: Environment variables EMAIL_USER or EMAIL_PASS are missing.")
         return
 
-    msg = EmailMessage()
-    msg['Subject'] = subject
-    msg['From'] = email_address
-    msg['To'] = email_address
-    msg.set_content("Your email client does not support HTML.") # Fallback
-    msg.add_alternative(body_html, subtype='html')
+    raw_message = build_raw_email(session.email_address, session.email_address, subject, body_html)
 
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(email_address, email_password)
-            smtp.send_message(msg)
-            print("✅ Email sent successfully!")
+        session.send(session.email_address, raw_message)
+        print("✅ Email sent successfully!")
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
 
-def main():
+def process_schedule(session):
     # 1. Get Today's Info
     today = date.today()
     today_day_name = today.strftime("%A") # e.g., "Monday"
-    today_str = today.strftime("%Y-%m-%d")
+    today_str = today.isoformat() # e.g., "2026-02-23"
     
     print(f"Processing schedule for: {today_day_name}, {today_str}")
 
@@ -150,64 +314,66 @@ def main():
         return
 
     # 3. Filter by Day of Week
-    if 'Day' not in df.columns:
-        print("❌ Error: 'Day' column not found in Excel file.")
-        return
-        
-    daily_classes = df[df['Day'].str.lower() == today_day_name.lower()]
+    daily_classes = df[df['_day_lc'] == today_day_name.lower()]
 
     if daily_classes.empty:
         print("No classes scheduled for today (based on Excel day).")
         if SEND_EMPTY_EMAIL:
-             send_email(f"📅 Schedule: Free Day!", "<h3>No classes today! 🎉</h3>")
+             send_email(session, f"📅 Schedule: Free Day!", "<h3>No classes today! 🎉</h3>")
         return
 
     # 4. Filter by Academic Week Parity (Odd/Even)
-    if 'WeekType' not in daily_classes.columns:
-        print("❌ Error: 'WeekType' column not found in Excel file.")
-        return
-        
     current_parity = get_academic_week_parity(today)
     
     if current_parity == "holiday":
         print("Enjoy your holiday! No classes this week.")
         if SEND_EMPTY_EMAIL:
-             send_email("📅 Schedule: Holiday!", "<h3>It's a holiday week! No classes. 🎉</h3>")
+             send_email(session, "📅 Schedule: Holiday!", "<h3>It's a holiday week! No classes. 🎉</h3>")
         return
 
     print(f"Current Academic Week Parity: {current_parity.capitalize()}")
 
-    daily_classes = daily_classes[
-        (daily_classes['WeekType'].fillna('all').str.lower() == 'all') | 
-        (daily_classes['WeekType'].fillna('all').str.lower() == current_parity)
-    ]
+    daily_classes = daily_classes[daily_classes['_wt_lc'].isin(('all', current_parity))]
 
-    exception_rule = get_todays_exceptions()
+    # Nothing left to cancel after the parity filter, so don't even read exceptions.json
+    exception_rule = None if daily_classes.empty else get_todays_exceptions(today_str)
     
     if exception_rule:
         print(f"Found exceptions for today: {exception_rule.get('note', 'No note')}")
         
+        # Combine both cancellation rules into one mask so the frame is only sliced once
+        keep = pd.Series(True, index=daily_classes.index)
+
         # Filter out cancelled hours
         cancel_hours = exception_rule.get("cancel_hours", [])
         if cancel_hours:
-            daily_classes = daily_classes[~daily_classes['Time'].isin(cancel_hours)]
+            keep &= ~daily_classes['Time'].isin(cancel_hours)
 
         # Filter out cancelled courses
         cancel_courses = exception_rule.get("cancel_courses", [])
-        if cancel_courses:
-            pattern = '|'.join(cancel_courses) 
-            if pattern:
-                 daily_classes = daily_classes[~daily_classes['Course'].str.contains(pattern, case=False, na=False)]
+        cancel_courses = [course for course in cancel_courses if course]
+        if cancel_courses and keep.any():
+            # Course names are matched literally, so names like "C++" don't break the pattern
+            pattern = re.compile('|'.join(map(re.escape, cancel_courses)), re.IGNORECASE)
+            keep &= ~daily_classes['Course'].str.contains(pattern, na=False)
+
+        if not keep.all():
+            daily_classes = daily_classes[keep]
 
     # 6. Final Check and Send
     if daily_classes.empty:
         print("All remaining classes for today were filtered out (parity or exceptions).")
         if SEND_EMPTY_EMAIL:
-            send_email(f"📅 Schedule: {today_str}", "<h3>No classes to attend today! 🎉</h3>")
+            send_email(session, f"📅 Schedule: {today_str}", "<h3>No classes to attend today! 🎉</h3>")
     else:
         print(f"Sending email with {len(daily_classes)} classes...")
         body = format_email_body(daily_classes, today_str)
-        send_email(f"📅 Uni Schedule for {today_str}", body)
+        send_email(session, f"📅 Uni Schedule for {today_str}", body)
+
+def main():
+    # Credentials come from Environment Variables; one SMTP login is shared by every email sent
+    with SMTPSession(os.environ.get('EMAIL_USER'), os.environ.get('EMAIL_PASS')) as session:
+        process_schedule(session)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file